@@ -0,0 +1,79 @@
+"""Shared SQLite access for the EcoMarine pages.
+
+Writes go through a single connection guarded by a lock, while reads are
+served from a small pool of read-only connections so that pages querying
+marine_data.db at the same time do not queue behind each other.
+"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import streamlit as st
+
+DB_PATH = "marine_data.db"
+READ_POOL_SIZE = 4
+
+_write_lock = threading.Lock()
+
+
+def _configure(conn: sqlite3.Connection) -> sqlite3.Connection:
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-20000")
+    return conn
+
+
+@st.cache_resource
+def get_write_connection() -> sqlite3.Connection:
+    """Open the single read-write connection, creating the database if needed."""
+    # Autocommit mode: write_connection() issues BEGIN/COMMIT itself
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=rwc", uri=True, check_same_thread=False,
+                           isolation_level=None)
+    # WAL lets the read-only pool keep reading while this connection writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return _configure(conn)
+
+
+@st.cache_resource
+def get_read_pool() -> queue.Queue:
+    """Open READ_POOL_SIZE read-only connections to share between reruns."""
+    # Make sure the file exists and is in WAL mode before opening it read-only
+    get_write_connection()
+
+    pool = queue.Queue()
+    for _ in range(READ_POOL_SIZE):
+        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only=1")
+        pool.put(_configure(conn))
+    return pool
+
+
+@contextmanager
+def read_connection():
+    """Borrow a read-only connection from the pool for the duration of the block."""
+    pool = get_read_pool()
+    conn = pool.get()
+    try:
+        yield conn
+    finally:
+        pool.put(conn)
+
+
+@contextmanager
+def write_connection():
+    """Yield the write connection inside a BEGIN IMMEDIATE transaction, one writer at a time."""
+    conn = get_write_connection()
+    with _write_lock:
+        # Take the write lock up front rather than upgrading mid-transaction
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            # A failed COMMIT must not leave the shared connection mid-transaction,
+            # but SQLite may already have rolled back on its own
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
@@ -1,7 +1,7 @@
-import pydeck as pdk
-import pandas as pd
+import functools
 
 import pydeck as pdk
+import pandas as pd
 
 # Fish migration path data
 fish_paths_data = [
@@ -41,6 +41,24 @@ fish_locations_data = [
     {"coordinates": [42, -7], "species": "Billfish"},
 ]
 
+# Flatten into typed columns once at import so layers reference columns by name
+fish_paths_df = pd.DataFrame({
+    "src_x": [p["start"][0] for p in fish_paths_data],
+    "src_y": [p["start"][1] for p in fish_paths_data],
+    "dst_x": [p["end"][0] for p in fish_paths_data],
+    "dst_y": [p["end"][1] for p in fish_paths_data],
+    "r": [p["color"][0] for p in fish_paths_data],
+    "g": [p["color"][1] for p in fish_paths_data],
+    "b": [p["color"][2] for p in fish_paths_data],
+}).astype({"src_x": "float32", "src_y": "float32", "dst_x": "float32", "dst_y": "float32",
+           "r": "uint8", "g": "uint8", "b": "uint8"})
+
+fish_locations_df = pd.DataFrame({
+    "lon": [loc["coordinates"][0] for loc in fish_locations_data],
+    "lat": [loc["coordinates"][1] for loc in fish_locations_data],
+    "species": [loc["species"] for loc in fish_locations_data],
+}).astype({"lon": "float32", "lat": "float32"})
+
 # View state
 INITIAL_VIEW_STATE = pdk.ViewState(
     latitude=-6,
@@ -50,37 +68,41 @@ INITIAL_VIEW_STATE = pdk.ViewState(
     bearing=0,
 )
 
-# Scatterplot layer for fish locations
-scatterplot_layer = pdk.Layer(
-    "ScatterplotLayer",
-    fish_locations_data,
-    radius_scale=20,
-    get_position="coordinates",
-    get_fill_color=[0, 128, 255],  # Blue for fish locations
-    get_radius=100,
-    pickable=True,
-    auto_highlight=True,
-    get_tooltip = {"html": "<b>Species:</b> {species}"}
+@functools.lru_cache(maxsize=1)
+def build_deck():
+    """Build the fish migration deck once; later calls reuse the same object."""
+    # Scatterplot layer for fish locations
+    scatterplot_layer = pdk.Layer(
+        "ScatterplotLayer",
+        fish_locations_df,
+        radius_scale=20,
+        get_position=["lon", "lat"],
+        get_fill_color=[0, 128, 255],  # Blue for fish locations
+        get_radius=100,
+        pickable=True,
+        auto_highlight=True,
+        get_tooltip = {"html": "<b>Species:</b> {species}"}
 
-)
+    )
 
-# Line layer for migration paths
-line_layer = pdk.Layer(
-    "LineLayer",
-    fish_paths_data,
-    get_source_position="start",
-    get_target_position="end",
-    get_color="color",
-    get_width=3,
-    highlight_color=[255, 255, 0],
-    picking_radius=10,
-    auto_highlight=True,
-    pickable=True,
-)
+    # Line layer for migration paths
+    line_layer = pdk.Layer(
+        "LineLayer",
+        fish_paths_df,
+        get_source_position=["src_x", "src_y"],
+        get_target_position=["dst_x", "dst_y"],
+        get_color=["r", "g", "b"],
+        get_width=3,
+        highlight_color=[255, 255, 0],
+        picking_radius=10,
+        auto_highlight=True,
+        pickable=True,
+    )
 
-# Combine layers and render
-layers = [scatterplot_layer, line_layer]
-r = pdk.Deck(layers=layers, initial_view_state=INITIAL_VIEW_STATE)
-r.to_html("fish_migration_full.html")
+    # Combine layers
+    layers = [scatterplot_layer, line_layer]
+    return pdk.Deck(layers=layers, initial_view_state=INITIAL_VIEW_STATE)
 
-#print("Fish migration map generated (fish_migration_full.html)")
\ No newline at end of file
+if __name__ == "__main__":
+    build_deck().to_html("fish_migration_full.html")
+    #print("Fish migration map generated (fish_migration_full.html)")
@@ -3,17 +3,20 @@ import streamlit as st
 # Set page title
 st.set_page_config(page_title="EcoMarine", layout="wide")
 
-# Sidebar Navigation
-st.sidebar.title("Navigation")
-page = st.sidebar.radio("Go to", ["Home", "Marine Map", "Marketplace", "Analytics"])
+# Read image files once and share the same immutable bytes across reruns and sessions
+# (cache_data would unpickle a fresh copy of every file on each call)
+@st.cache_resource
+def load_image(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
 
 # Home Page
-if page == "Home":
+def home():
     st.title("Welcome to EcoMarine 🌊")
     st.subheader("Mapping the Ocean for a Sustainable Future")
 
     # Hero Section
-    st.image("./images/fish.jpg", use_container_width=True)
+    st.image(load_image("./images/fish.jpg"), use_container_width=True)
 
     # Quick Statistics
     col1, col2, col3 = st.columns(3)
@@ -29,24 +32,25 @@ if page == "Home":
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.image("./images/yellow.jpg")
+        st.image(load_image("./images/yellow.jpg"))
         st.write("📍 **Real-time Fish Tracking**")
         st.write("Monitor fish movements to improve fishing efficiency.")
 
     with col2:
-        st.image("./images/litter.jpg")
+        st.image(load_image("./images/litter.jpg"))
         st.write("🌱 **Marine Litter Analysis**")
         st.write("Identify pollution hotspots and support clean-up efforts.")
 
     with col3:
-        st.image("./images/litter.jpg")
+        st.image(load_image("./images/litter.jpg"))
         st.write("🛒 **Fisher-Buyer Market**")
         st.write("Connect fishers directly with buyers for fair trade.")
 
-# Load other pages
-elif page == "Marine Map":
-    exec(open("pages/marine.py").read())
-elif page == "Marketplace":
-    exec(open("pages/market.py").read())
-elif page == "Analytics":
-    exec(open("pages/analytics.py").read())
+# Sidebar Navigation (Streamlit runs the selected page file itself)
+page = st.navigation([
+    st.Page(home, title="Home", default=True),
+    st.Page("pages/marine.py", title="Marine Map"),
+    st.Page("pages/market.py", title="Marketplace"),
+    st.Page("pages/analytics.py", title="Analytics"),
+])
+page.run()
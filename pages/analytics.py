@@ -1,56 +1,74 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import numpy as np
 
+from database import read_connection, write_connection
+
 st.title("Analytics 📊")
 st.write("View trends in oceanic data.")
 
-# Initialize SQLite database
+# Mock data insert statements
+INSERT_WEATHER_SQL = "INSERT INTO weather_patterns (week, temperature) VALUES (?, ?)"
+INSERT_POLLUTION_SQL = "INSERT INTO pollution_trends (month, litter_collected) VALUES (?, ?)"
+
+# Initialize SQLite database, seeding any empty table, once per process so
+# reruns of this read-only page never touch the write connection
+@st.cache_resource
 def init_db():
-    conn = sqlite3.connect("marine_data.db")
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS weather_patterns (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    week INTEGER,
-                    temperature REAL)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS pollution_trends (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    month TEXT,
-                    litter_collected REAL)''')
-    conn.commit()
-    conn.close()
+    with write_connection() as conn:
+        c = conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS weather_patterns (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        week INTEGER,
+                        temperature REAL)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS pollution_trends (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        month TEXT,
+                        litter_collected REAL)''')
 
-# Generate mock data
-def generate_mock_data():
-    conn = sqlite3.connect("marine_data.db")
-    c = conn.cursor()
-    
-    weather_data = [(i, np.random.uniform(22, 30)) for i in range(1, 5)]
-    c.executemany("INSERT INTO weather_patterns (week, temperature) VALUES (?, ?)", weather_data)
-    
-    pollution_data = [(month, np.random.randint(400, 1000)) for month in ["Jan", "Feb", "Mar"]]
-    c.executemany("INSERT INTO pollution_trends (month, litter_collected) VALUES (?, ?)", pollution_data)
+        c.execute("SELECT EXISTS (SELECT 1 FROM weather_patterns)")
+        seed_weather = not c.fetchone()[0]
+        c.execute("SELECT EXISTS (SELECT 1 FROM pollution_trends)")
+        seed_pollution = not c.fetchone()[0]
+        generate_mock_data(c, seed_weather, seed_pollution)
+    return True
+
+# Generate mock data for the requested tables inside the caller's transaction
+def generate_mock_data(c, weather: bool = True, pollution: bool = True) -> None:
+    if weather:
+        # Draw each column in one call; tolist() hands sqlite3 plain Python numbers
+        weeks = np.arange(1, 5)
+        temperatures = np.random.uniform(22, 30, len(weeks))
+        weather_data = zip(weeks.tolist(), temperatures.tolist())
+        c.executemany(INSERT_WEATHER_SQL, weather_data)
     
-    conn.commit()
-    conn.close()
+    if pollution:
+        months = ["Jan", "Feb", "Mar"]
+        litter = np.random.randint(400, 1000, len(months))
+        pollution_data = zip(months, litter.tolist())
+        c.executemany(INSERT_POLLUTION_SQL, pollution_data)
 
-# Fetch data
+# Fetch data, aggregated in SQLite so only one row per bucket reaches pandas
+@st.cache_data(ttl=60)
 def fetch_weather_data():
-    conn = sqlite3.connect("marine_data.db")
-    df = pd.read_sql("SELECT * FROM weather_patterns", conn)
-    conn.close()
-    return df
+    query = """SELECT week, AVG(temperature) AS temperature
+               FROM weather_patterns GROUP BY week ORDER BY week"""
+    with read_connection() as conn:
+        return pd.read_sql(query, conn)
 
+@st.cache_data(ttl=60)
 def fetch_pollution_data():
-    conn = sqlite3.connect("marine_data.db")
-    df = pd.read_sql("SELECT * FROM pollution_trends", conn)
-    conn.close()
-    return df
+    query = """SELECT month, SUM(litter_collected) AS litter_collected
+               FROM pollution_trends GROUP BY month ORDER BY MIN(id)"""
+    with read_connection() as conn:
+        return pd.read_sql(query, conn)
+
+@st.cache_data
+def build_fish_movement_trends() -> pd.DataFrame:
+    return pd.DataFrame({"Week": [1, 2, 3, 4], "Fish Schools": [10, 15, 13, 20]}).set_index("Week")
 
 # Initialize DB and generate mock data
 init_db()
-generate_mock_data()
 
 # Create tabs
 tabs = st.tabs(["Weather Patterns", "Pollution Trends", "Fish Movement"])
@@ -70,5 +88,5 @@ with tabs[1]:
 with tabs[2]:
     st.subheader("Fish Movement Trends")
     st.write("Monitor fish school movement patterns.")
-    st.line_chart({"Week": [1, 2, 3, 4], "Fish Schools": [10, 15, 13, 20]})
+    st.line_chart(build_fish_movement_trends())
 
@@ -3,18 +3,50 @@ import pandas as pd
 import numpy as np
 import pydeck as pdk
 import sqlite3
-import time
 from math import radians, sin, cos, sqrt, atan2
+from streamlit_autorefresh import st_autorefresh
+
+from database import read_connection, write_connection
 
 # Page Title
 st.title("East African Fish Migration Tracker 🐟")
 st.write("Monitor natural migration patterns of fish species along the East African coastline.")
 
+# Insert statements used by generate_east_african_data
+INSERT_FISH_SCHOOL_SQL = "INSERT INTO fish_schools (lat, lon, confidence) VALUES (?, ?, ?)"
+INSERT_MIGRATION_SQL = """INSERT INTO migrations 
+                (species, latitude, longitude, speed, direction, sin_dir, cos_dir,
+                 target_latitude, target_longitude, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+# East African species tracked by the page, and their map colors row for row.
+# The trailing grey row is what species outside SPECIES (category code -1) map to.
+SPECIES = np.array([
+    "Yellowfin Tuna", "Kingfish", "Black Marlin", "Sailfish",
+    "Dorado", "Barracuda", "Skipjack Tuna", "Wahoo"
+])
+COLORS = np.array([
+    [255, 0, 0],
+    [0, 0, 255],
+    [128, 0, 128],
+    [0, 128, 128],
+    [255, 165, 0],
+    [0, 128, 0],
+    [255, 0, 128],
+    [0, 255, 128],
+    [200, 200, 200],
+], dtype=np.uint8)
+
+def species_codes(species) -> np.ndarray:
+    """Return each species' row in COLORS, -1 for species not in SPECIES."""
+    return pd.Categorical(species, categories=SPECIES).codes
+
 # Initialize SQLite database
+@st.cache_resource
 def init_db():
-    """Initialize database with proper error handling and transactions."""
+    """Initialize database schema once per process and seed it when empty."""
     try:
-        with sqlite3.connect("marine_data.db") as conn:
+        with write_connection() as conn:
             c = conn.cursor()
             
             # Create fish schools table with spatial metadata
@@ -34,20 +66,46 @@ def init_db():
                         longitude REAL NOT NULL CHECK(longitude BETWEEN -180 AND 180),
                         speed REAL NOT NULL CHECK(speed >= 0),
                         direction REAL NOT NULL CHECK(direction BETWEEN 0 AND 360),
+                        sin_dir REAL NOT NULL DEFAULT 0,
+                        cos_dir REAL NOT NULL DEFAULT 0,
                         target_latitude REAL NOT NULL CHECK(target_latitude BETWEEN -90 AND 90),
                         target_longitude REAL NOT NULL CHECK(target_longitude BETWEEN -180 AND 180),
                         timestamp TEXT NOT NULL,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )""")
             
-            # Create index for faster species lookups
-            c.execute("CREATE INDEX IF NOT EXISTS idx_migrations_species ON migrations(species)")
-            
-            conn.commit()
+            # Databases created before the heading columns existed get them added
+            # and backfilled once from the stored directions
+            columns = {row[1] for row in c.execute("PRAGMA table_info(migrations)")}
+            if "sin_dir" not in columns:
+                c.execute("ALTER TABLE migrations ADD COLUMN sin_dir REAL NOT NULL DEFAULT 0")
+                c.execute("ALTER TABLE migrations ADD COLUMN cos_dir REAL NOT NULL DEFAULT 0")
+                rows = c.execute("SELECT id, direction FROM migrations").fetchall()
+                if rows:
+                    ids, directions = zip(*rows)
+                    headings = np.radians(directions)
+                    c.executemany(
+                        "UPDATE migrations SET sin_dir = ?, cos_dir = ? WHERE id = ?",
+                        zip(np.sin(headings).tolist(), np.cos(headings).tolist(), ids),
+                    )
+            
+            # Composite index serves both species lookups and species + time window filters
+            c.execute("CREATE INDEX IF NOT EXISTS idx_migrations_species_ts ON migrations(species, timestamp)")
+            c.execute("DROP INDEX IF EXISTS idx_migrations_species")
+            # Range scans for the time window when no species filter is applied
+            c.execute("CREATE INDEX IF NOT EXISTS idx_migrations_ts ON migrations(timestamp)")
+
+            # Only seed on first run; the sidebar button regenerates on demand
+            c.execute("SELECT COUNT(*) FROM fish_schools")
+            needs_seed = c.fetchone()[0] == 0
     except sqlite3.Error as e:
         st.error(f"Database initialization failed: {str(e)}")
         raise
 
+    if needs_seed:
+        generate_east_african_data()
+    return True
+
 def generate_east_african_data(schools_count: int = 50, migrations_count: int = 50) -> None:
     """
     Generate synthetic marine data for East African coastline with realistic migration patterns.
@@ -57,9 +115,9 @@ def generate_east_african_data(schools_count: int = 50, migrations_count: int =
         migrations_count: Number of migration records to generate
     """
     try:
-        with sqlite3.connect("marine_data.db") as conn:
+        # The write connection wraps everything in one transaction
+        with write_connection() as conn:
             c = conn.cursor()
-            c.execute("BEGIN TRANSACTION")
 
             # Clear existing data
             c.execute("DELETE FROM fish_schools")
@@ -72,97 +130,86 @@ def generate_east_african_data(schools_count: int = 50, migrations_count: int =
             lons = np.random.uniform(39, 45, schools_count)  # Indian Ocean coastline
             confidences = np.random.uniform(50, 100, schools_count)
             
-            c.executemany(
-                "INSERT INTO fish_schools (lat, lon, confidence) VALUES (?, ?, ?)",
-                zip(lats, lons, confidences)
-            )
+            # tolist() converts to Python floats once instead of per bound parameter
+            c.executemany(INSERT_FISH_SCHOOL_SQL, np.column_stack([lats, lons, confidences]).tolist())
 
             # Generate migration data with East African species and seasonal patterns
-            east_african_species = [
-                "Yellowfin Tuna", "Kingfish", "Black Marlin", "Sailfish", 
-                "Dorado", "Barracuda", "Skipjack Tuna", "Wahoo"
-            ]
-            
-            # Current month to determine seasonal patterns
-            current_month = pd.Timestamp.now().month
+            # One clock read serves both the seasonal patterns and the timestamps
+            now = pd.Timestamp.now()
+            current_month = now.month
             
             # Define seasonal migration patterns based on month
             # 1-3: Northeast monsoon, 4-5: Transition, 6-9: Southeast monsoon, 10-12: Transition
             is_northeast_monsoon = 1 <= current_month <= 3
             is_southeast_monsoon = 6 <= current_month <= 9
             
-            species = np.random.choice(east_african_species, migrations_count)
+            species = np.random.choice(SPECIES, migrations_count)
             
             # Base coordinates along the coastline
             base_lats = np.random.uniform(-15, 5, migrations_count)
             base_lons = np.random.uniform(39, 45, migrations_count)
             
-            # Realistic speeds for different fish species
-            speeds = []
-            for s in species:
-                if s in ["Yellowfin Tuna", "Skipjack Tuna"]:
-                    speeds.append(np.random.uniform(4, 7))  # Faster swimmers
-                elif s in ["Black Marlin", "Sailfish"]:
-                    speeds.append(np.random.uniform(6, 10))  # Very fast swimmers
-                elif s == "Wahoo":
-                    speeds.append(np.random.uniform(5, 8))  # Fast swimmers
-                else:
-                    speeds.append(np.random.uniform(2, 5))  # Average swimmers
+            # Realistic speeds for different fish species, drawn in one call with
+            # per-row bounds: faster, very fast, fast, otherwise average swimmers
+            speed_groups = [
+                np.isin(species, ["Yellowfin Tuna", "Skipjack Tuna"]),
+                np.isin(species, ["Black Marlin", "Sailfish"]),
+                species == "Wahoo",
+            ]
+            speeds = np.random.uniform(np.select(speed_groups, [4, 6, 5], default=2),
+                                       np.select(speed_groups, [7, 10, 8], default=5))
+            
+            # Directional bias based on species and season, as a start heading plus a
+            # clockwise span so ranges crossing north (e.g. 330°-30°) wrap correctly
+            if is_northeast_monsoon:
+                # During NE monsoon, many species move southward along the coast
+                direction_groups = [
+                    np.isin(species, ["Yellowfin Tuna", "Skipjack Tuna", "Dorado"]),  # Southward
+                    np.isin(species, ["Kingfish", "Barracuda"]),  # South/Southeast
+                ]
+                # Everything else: variable but mostly southward (90°-270°)
+                direction_start = np.select(direction_groups, [150, 120], default=90)
+                direction_span = np.select(direction_groups, [60, 120], default=180)
+            elif is_southeast_monsoon:
+                # During SE monsoon, many species move northward
+                direction_groups = [
+                    np.isin(species, ["Black Marlin", "Sailfish", "Wahoo"]),  # Northward
+                    np.isin(species, ["Yellowfin Tuna", "Kingfish"]),  # North/Northeast
+                ]
+                # Everything else: variable but mostly northward (270°-90°)
+                direction_start = np.select(direction_groups, [330, 300], default=270)
+                direction_span = np.select(direction_groups, [60, 120], default=180)
+            else:
+                # Transition periods have more mixed patterns
+                direction_start, direction_span = 0, 360
             
-            # Directional bias based on species and season
-            directions = []
-            for i, s in enumerate(species):
-                if is_northeast_monsoon:
-                    # During NE monsoon, many species move southward along the coast
-                    if s in ["Yellowfin Tuna", "Skipjack Tuna", "Dorado"]:
-                        directions.append(np.random.uniform(150, 210))  # Southward
-                    elif s in ["Kingfish", "Barracuda"]:
-                        directions.append(np.random.uniform(120, 240))  # South/Southeast
-                    else:
-                        directions.append(np.random.uniform(90, 270))  # Variable but mostly southward
-                elif is_southeast_monsoon:
-                    # During SE monsoon, many species move northward
-                    if s in ["Black Marlin", "Sailfish", "Wahoo"]:
-                        directions.append(np.random.uniform(330, 30))  # Northward
-                    elif s in ["Yellowfin Tuna", "Kingfish"]:
-                        directions.append(np.random.uniform(300, 60))  # North/Northeast
-                    else:
-                        directions.append(np.random.uniform(270, 90))  # Variable but mostly northward
-                else:
-                    # Transition periods have more mixed patterns
-                    directions.append(np.random.uniform(0, 360))
-                    
-                # Add some randomness to make patterns more natural
-                directions[-1] = (directions[-1] + np.random.uniform(-20, 20)) % 360
+            # Add some randomness to make patterns more natural
+            jitter = np.random.uniform(-20, 20, migrations_count)
+            directions = (direction_start + direction_span * np.random.uniform(0, 1, migrations_count)
+                          + jitter) % 360
             
             # Vectorized coordinate calculations for target positions
             # Larger delta for more visible migration paths
-            delta = np.array(speeds) / 20  # Adjust for more visible paths
-            target_lats = base_lats + delta * np.sin(np.radians(directions))
-            target_lons = base_lons + delta * np.cos(np.radians(directions))
-            
-            # Timestamps with seasonal patterns
-            base_time = pd.Timestamp.now()
-            timestamps = [base_time - pd.Timedelta(minutes=np.random.randint(0, 120)) 
-                         for _ in range(migrations_count)]
-
-            c.executemany(
-                """INSERT INTO migrations 
-                (species, latitude, longitude, speed, direction,
-                 target_latitude, target_longitude, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                zip(species, base_lats, base_lons, speeds, directions,
-                    target_lats, target_lons, [t.isoformat() for t in timestamps])
-            )
+            delta = speeds / 20  # Adjust for more visible paths
+            # Stored with each row so readers never recompute the trig
+            sin_dirs = np.sin(np.radians(directions))
+            cos_dirs = np.cos(np.radians(directions))
+            target_lats = base_lats + delta * sin_dirs
+            target_lons = base_lons + delta * cos_dirs
+            
+            # Timestamps within the last two hours, formatted as ISO strings in one pass
+            minutes_ago = np.random.randint(0, 120, migrations_count).astype("timedelta64[m]")
+            timestamps = (now.to_datetime64() - minutes_ago).astype("datetime64[us]").astype(str)
 
-            conn.commit()
+            # One structured buffer feeds executemany with plain Python rows
+            rows = np.rec.fromarrays([species, base_lats, base_lons, speeds, directions,
+                                      sin_dirs, cos_dirs, target_lats, target_lons, timestamps])
+            c.executemany(INSERT_MIGRATION_SQL, rows.tolist())
             
     except sqlite3.Error as e:
-        conn.rollback()
         st.error(f"Mock data generation failed: {str(e)}")
         raise
     except Exception as e:
-        conn.rollback()
         st.error(f"Unexpected error: {str(e)}")
         raise
 
@@ -175,23 +222,42 @@ if st.sidebar.button("Generate East African Migration Data"):
     st.sidebar.success("Generated new East African fish migration data!")
     st.rerun()
 
-@st.cache_data(ttl=300)
-def fetch_fish_schools():
-    conn = sqlite3.connect("marine_data.db")
-    df = pd.read_sql("SELECT * FROM fish_schools", conn)
-    conn.close()
-    return df
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_species():
+    # Answered from the (species, timestamp) index without touching the table
+    with read_connection() as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT species FROM migrations ORDER BY species")]
+
+def migration_filter(species: tuple, since: str):
+    """Return the WHERE clause and parameters shared by the migration queries."""
+    where = "WHERE timestamp >= ?"
+    params = [since]
+    if species:
+        where += f" AND species IN ({', '.join('?' * len(species))})"
+        params.extend(species)
+    return where, params
 
-@st.cache_data(ttl=300)
-def fetch_migrations():
-    conn = sqlite3.connect("marine_data.db")
-    df = pd.read_sql("SELECT * FROM migrations", conn, parse_dates=["timestamp"])
-    conn.close()
-    return df
+# Short TTL so each auto-refresh picks up new migration rows
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_migrations(species: tuple, since: str) -> pd.DataFrame:
+    """Fetch migrations recorded at or after `since`, limited to `species` when any are given."""
+    where, params = migration_filter(species, since)
+    query = f"""SELECT id, species, latitude, longitude, speed, direction, sin_dir, cos_dir,
+                       target_latitude, target_longitude, timestamp
+                FROM migrations {where}
+                ORDER BY id"""
+    with read_connection() as conn:
+        return pd.read_sql(query, conn, params=params, parse_dates=["timestamp"])
 
-# Load data
-fish_schools = fetch_fish_schools()
-migrations = fetch_migrations()
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_species_stats(species: tuple, since: str) -> pd.DataFrame:
+    """Count, average speed and mean heading vector per species, aggregated by SQLite."""
+    where, params = migration_filter(species, since)
+    query = f"""SELECT species, COUNT(*) AS count, AVG(speed) AS avg_speed,
+                       AVG(sin_dir) AS sin_dir, AVG(cos_dir) AS cos_dir
+                FROM migrations {where} GROUP BY species"""
+    with read_connection() as conn:
+        return pd.read_sql(query, conn, params=params, index_col="species")
 
 # East African Map View
 east_african_view = pdk.ViewState(
@@ -205,93 +271,117 @@ east_african_view = pdk.ViewState(
 st.sidebar.title("Filter Options")
 
 # Species selection for migration patterns
-species_list = migrations["species"].unique().tolist()
+species_list = fetch_species()
 selected_species = st.sidebar.multiselect(
     "Select Fish Species", 
     species_list,
     default=species_list[:2] if len(species_list) >= 2 else species_list
 )
 
-# Time window for migrations
+# Time window for migrations; the clock is read once per rerun and reused below
 time_window = st.sidebar.slider("Time Window (minutes)", 10, 120, 60)
-latest_time = pd.Timestamp.now() - pd.Timedelta(minutes=time_window)
+now = pd.Timestamp.now()
+latest_time = now - pd.Timedelta(minutes=time_window)
 
-# Filter migrations based on species and time
-if selected_species:
-    filtered_migrations = migrations[
-        (migrations["species"].isin(selected_species)) & 
-        (migrations["timestamp"] >= latest_time)
-    ]
-else:
-    filtered_migrations = migrations[migrations["timestamp"] >= latest_time]
+# Filter migrations based on species and time in SQL. The cutoff is floored
+# to the minute so reruns within the same minute hit the fetch cache.
+since = latest_time.floor("min").isoformat()
+filtered_migrations = fetch_migrations(tuple(selected_species), since)
 
-# Main content area
-col1, col2 = st.columns([2, 1])
+# Project every filtered migration 24 hours ahead in one vectorized pass, so picking
+# a migration below is just a row lookup. Simple projection (not accounting for
+# Earth's curvature for short distances), approx 111 km per degree of latitude.
+distance_km = filtered_migrations["speed"].to_numpy() * 24
+current_lat = filtered_migrations["latitude"].to_numpy()
+filtered_migrations = filtered_migrations.assign(
+    proj_lat=current_lat + distance_km * filtered_migrations["sin_dir"].to_numpy() / 111,
+    proj_lon=filtered_migrations["longitude"].to_numpy()
+    + distance_km * filtered_migrations["cos_dir"].to_numpy() / (111 * np.cos(np.radians(current_lat))),
+)
 
-with col1:
-    st.subheader("East African Fish Migration Patterns")
-    
-    # Create species-specific migration layers with different colors
+# 16-point compass rose, one entry per 22.5° sector
+_CARDINALS = np.array(["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+                       "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"])
+
+# Convert direction to cardinal direction; accepts a single heading or an array of them
+def direction_to_cardinal(direction):
+    return _CARDINALS[np.round(np.asarray(direction) / 22.5).astype(int) % 16]
+
+@st.cache_data
+def build_legend_html(selected_species: tuple) -> list:
+    """Return the legend entries for each of the four legend columns as one HTML block."""
+    blocks = ["", "", "", ""]
+    for i, (species, color) in enumerate(zip(SPECIES, COLORS)):
+        if species in selected_species:
+            blocks[i % 4] += (
+                f"<div style='display: flex; align-items: center;'>"
+                f"<div style='background-color: rgb({color[0]}, {color[1]}, {color[2]}); "
+                f"width: 15px; height: 15px; margin-right: 5px; border-radius: 50%;'></div>"
+                f"<span>{species}</span>"
+                f"</div>"
+            )
+    return blocks
+
+# Decks are cached so reruns that don't change their inputs reuse the built layers;
+# they are keyed on per-request data, so each cache keeps only recent entries
+@st.cache_resource(max_entries=32)
+def build_migration_deck(filtered_migrations: pd.DataFrame, selected_species: list) -> pdk.Deck:
+    """Build the main migration map for the selected species."""
     migration_layers = []
+
+    # Only the columns the layers and tooltip read are serialized into the deck JSON
+    layer_columns = ["species", "latitude", "longitude", "speed", "direction",
+                     "target_latitude", "target_longitude"]
+    migration_data = filtered_migrations.loc[
+        filtered_migrations["species"].isin(selected_species), layer_columns
+    ]
     
-    # Color map for different species
-    species_colors = {
-        "Yellowfin Tuna": [255, 0, 0],
-        "Kingfish": [0, 0, 255],
-        "Black Marlin": [128, 0, 128],
-        "Sailfish": [0, 128, 128],
-        "Dorado": [255, 165, 0],
-        "Barracuda": [0, 128, 0],
-        "Skipjack Tuna": [255, 0, 128],
-        "Wahoo": [0, 255, 128]
-    }
-    
-    for species in selected_species:
-        species_data = filtered_migrations[filtered_migrations["species"] == species]
+    if not migration_data.empty:
+        # Color each row by species once, so one layer per kind covers every species
+        rgb = COLORS[species_codes(migration_data["species"])]
+        migration_data = migration_data.assign(r=rgb[:, 0], g=rgb[:, 1], b=rgb[:, 2])
         
-        if not species_data.empty:
-            # Points layer for the species
-            point_layer = pdk.Layer(
-                "ScatterplotLayer",
-                species_data,
-                get_position=["longitude", "latitude"],
-                get_fill_color=species_colors.get(species, [200, 200, 200]),
-                get_radius=3000,
-                pickable=True,
-                auto_highlight=True,
-                get_tooltip = {"html": f"<b>Species:</b> {species}<br><b>Speed:</b> {{speed}} km/h"}
-            )
-            
-            # Path layer showing migration direction
-            path_layer = pdk.Layer(
-                "LineLayer",
-                species_data,
-                get_source_position=["longitude", "latitude"],
-                get_target_position=["target_longitude", "target_latitude"],
-                get_color=species_colors.get(species, [200, 200, 200]),
-                get_width=2,
-                highlight_color=[255, 255, 0],
-                picking_radius=10,
-                auto_highlight=True,
-                pickable=True,
-            )
-            
-            # Add arrow layer to show direction more clearly
-            arrow_layer = pdk.Layer(
-                "TextLayer",
-                species_data,
-                get_position=["target_longitude", "target_latitude"],
-                get_text="▶",  # Arrow character
-                get_size=16,
-                get_color=species_colors.get(species, [200, 200, 200]),
-                get_angle="direction",
-                pickable=True,
-            )
-            
-            migration_layers.extend([point_layer, path_layer, arrow_layer])
+        # Points layer for the migrations
+        point_layer = pdk.Layer(
+            "ScatterplotLayer",
+            migration_data,
+            get_position=["longitude", "latitude"],
+            get_fill_color=["r", "g", "b"],
+            get_radius=3000,
+            pickable=True,
+            auto_highlight=True,
+        )
+        
+        # Path layer showing migration direction
+        path_layer = pdk.Layer(
+            "LineLayer",
+            migration_data,
+            get_source_position=["longitude", "latitude"],
+            get_target_position=["target_longitude", "target_latitude"],
+            get_color=["r", "g", "b"],
+            get_width=2,
+            highlight_color=[255, 255, 0],
+            picking_radius=10,
+            auto_highlight=True,
+            pickable=True,
+        )
+        
+        # Add arrow layer to show direction more clearly
+        arrow_layer = pdk.Layer(
+            "TextLayer",
+            migration_data,
+            get_position=["target_longitude", "target_latitude"],
+            get_text="▶",  # Arrow character
+            get_size=16,
+            get_color=["r", "g", "b"],
+            get_angle="direction",
+            pickable=True,
+        )
+        
+        migration_layers.extend([point_layer, path_layer, arrow_layer])
     
     # Create the deck with all layers and tooltips
-    deck = pdk.Deck(
+    return pdk.Deck(
         layers=migration_layers,
         initial_view_state=east_african_view,
         tooltip={
@@ -309,35 +399,74 @@ with col1:
         map_provider="mapbox",
         map_style=pdk.map_styles.SATELLITE,
     )
+
+@st.cache_resource(max_entries=32)
+def build_projection_deck(species: str, lat: float, lon: float,
+                          projected_lat: float, projected_lon: float) -> pdk.Deck:
+    """Build the mini-map showing a migration's projected movement."""
+    color = COLORS[species_codes([species])[0]].tolist()
     
-    # Display the map
-    st.pydeck_chart(deck)
+    # Two points and one path: pydeck takes these as plain records, no DataFrame needed
+    projection_data = [
+        {'points': 'Current', 'lat': lat, 'lon': lon, 'color': color},
+        {'points': 'Projected', 'lat': projected_lat, 'lon': projected_lon, 'color': color},
+    ]
     
-    # Legend for species colors
-    st.subheader("Species Legend")
-    legend_cols = st.columns(4)
-    for i, (species, color) in enumerate(species_colors.items()):
-        if species in selected_species:
-            col_idx = i % 4
-            with legend_cols[col_idx]:
-                st.markdown(
-                    f"<div style='display: flex; align-items: center;'>"
-                    f"<div style='background-color: rgb({color[0]}, {color[1]}, {color[2]}); "
-                    f"width: 15px; height: 15px; margin-right: 5px; border-radius: 50%;'></div>"
-                    f"<span>{species}</span>"
-                    f"</div>",
-                    unsafe_allow_html=True
-                )
+    projection_layer = pdk.Layer(
+        "ScatterplotLayer",
+        projection_data,
+        get_position=["lon", "lat"],
+        get_radius=3000,
+        get_fill_color="color",
+        pickable=True,
+    )
+    
+    path_data = [{'path': [[lon, lat], [projected_lon, projected_lat]], 'color': color}]
+    
+    projection_path = pdk.Layer(
+        "PathLayer",
+        path_data,
+        get_path="path",
+        get_color="color",
+        width_scale=20,
+        width_min_pixels=2,
+        get_width=5,
+    )
+    
+    projection_view = pdk.ViewState(
+        latitude=(lat + projected_lat) / 2,
+        longitude=(lon + projected_lon) / 2,
+        zoom=7,
+        pitch=0
+    )
+    
+    return pdk.Deck(
+        layers=[projection_layer, projection_path],
+        initial_view_state=projection_view,
+        map_provider="mapbox",
+        map_style=pdk.map_styles.SATELLITE,
+    )
 
-with col2:
+# Picking a migration only reruns this fragment, so the main map is not re-sent
+@st.fragment
+def migration_details(filtered_migrations: pd.DataFrame, selected_species: list,
+                      since: str, now: pd.Timestamp) -> None:
+    """Show the migration picker with the selected migration's details and projection."""
     st.subheader("Migration Details")
     
     # Option to select migration point
     if not filtered_migrations.empty:
-        migration_options = [
-            f"{row['species']} #{row['id']} (Speed: {row['speed']:.1f} km/h)" 
-            for _, row in filtered_migrations.iterrows()
-        ]
+        # Labels only change with the fetched rows, so keep them in session state and
+        # rebuild only when the filters or the result set change (e.g. after regenerating)
+        options_fp = (tuple(selected_species), since, len(filtered_migrations),
+                      int(filtered_migrations["id"].iat[-1]))
+        if st.session_state.get("migration_options_fp") != options_fp:
+            st.session_state["migration_options"] = (
+                filtered_migrations["species"] + " #" + filtered_migrations["id"].astype(str)
+                + " (Speed: " + filtered_migrations["speed"].round(1).astype(str) + " km/h)"
+            ).tolist()
+            st.session_state["migration_options_fp"] = options_fp
+        migration_options = st.session_state["migration_options"]
         
         selected_migration_idx = st.selectbox(
             "Select Migration Point", 
@@ -347,7 +476,10 @@ with col2:
         )
         
         if selected_migration_idx is not None:
-            selected_migration = filtered_migrations.iloc[selected_migration_idx]
+            # Snapshot the row once as a plain dict; field reads below are dict lookups
+            selected_migration = filtered_migrations[
+                ["species", "latitude", "longitude", "speed", "direction", "proj_lat", "proj_lon"]
+            ].iloc[selected_migration_idx].to_dict()
             
             st.write(f"**Selected Migration Information:**")
             st.write(f"- Species: {selected_migration['species']}")
@@ -355,83 +487,27 @@ with col2:
             st.write(f"- Swimming Speed: {selected_migration['speed']:.1f} km/h")
             st.write(f"- Direction: {selected_migration['direction']:.1f}°")
             
-            # Convert direction to cardinal direction
-            def direction_to_cardinal(direction):
-                cardinals = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", 
-                             "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
-                idx = round(direction / 22.5) % 16
-                return cardinals[idx]
-            
             cardinal = direction_to_cardinal(selected_migration['direction'])
             st.write(f"- Cardinal Direction: {cardinal}")
             
-            # Calculate projected position after 24 hours
+            # Projected position after 24 hours, precomputed for every filtered row
             speed_km_per_day = selected_migration['speed'] * 24
-            
-            # Simple projection (not accounting for Earth's curvature for short distances)
-            direction_rad = np.radians(selected_migration['direction'])
-            lat_change = speed_km_per_day * np.sin(direction_rad) / 111  # Approx 111 km per degree of latitude
-            lon_change = speed_km_per_day * np.cos(direction_rad) / (111 * np.cos(np.radians(selected_migration['latitude'])))
-            
-            projected_lat = selected_migration['latitude'] + lat_change
-            projected_lon = selected_migration['longitude'] + lon_change
+            projected_lat = selected_migration['proj_lat']
+            projected_lon = selected_migration['proj_lon']
             
             st.write("**Projected Movement:**")
             st.write(f"- After 24 hours: {projected_lat:.4f}, {projected_lon:.4f}")
             st.write(f"- Distance traveled: ~{speed_km_per_day:.1f} km")
             
             # Show small map of projected movement
-            projection_df = pd.DataFrame({
-                'points': ['Current', 'Projected'],
-                'lat': [selected_migration['latitude'], projected_lat],
-                'lon': [selected_migration['longitude'], projected_lon],
-                'color': [[species_colors.get(selected_migration['species'], [200, 200, 200])], 
-                          [species_colors.get(selected_migration['species'], [200, 200, 200])]]
-            })
-            
-            projection_layer = pdk.Layer(
-                "ScatterplotLayer",
-                projection_df,
-                get_position=["lon", "lat"],
-                get_radius=3000,
-                get_fill_color="color",
-                pickable=True,
-            )
-            
-            path_df = pd.DataFrame({
-                'path': [[
-                    [selected_migration['longitude'], selected_migration['latitude']],
-                    [projected_lon, projected_lat]
-                ]],
-                'color': [species_colors.get(selected_migration['species'], [200, 200, 200])]
-            })
-            
-            projection_path = pdk.Layer(
-                "PathLayer",
-                path_df,
-                get_path="path",
-                get_color="color",
-                width_scale=20,
-                width_min_pixels=2,
-                get_width=5,
-            )
-            
-            projection_view = pdk.ViewState(
-                latitude=(selected_migration['latitude'] + projected_lat) / 2,
-                longitude=(selected_migration['longitude'] + projected_lon) / 2,
-                zoom=7,
-                pitch=0
-            )
-            
-            st.pydeck_chart(pdk.Deck(
-                layers=[projection_layer, projection_path],
-                initial_view_state=projection_view,
-                map_provider="mapbox",
-                map_style=pdk.map_styles.SATELLITE,
+            st.pydeck_chart(build_projection_deck(
+                selected_migration['species'],
+                selected_migration['latitude'], selected_migration['longitude'],
+                projected_lat, projected_lon,
             ))
             
             # Seasonal context
-            current_month = pd.Timestamp.now().month
+            current_month = now.month
             season = ""
             if 1 <= current_month <= 3:
                 season = "Northeast Monsoon (December-March)"
@@ -462,44 +538,56 @@ with col2:
     else:
         st.write("No migration points match the current filters.")
 
+# Main content area
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    st.subheader("East African Fish Migration Patterns")
+    
+    # Display the map
+    st.pydeck_chart(build_migration_deck(filtered_migrations, selected_species))
+    
+    # Legend for species colors
+    st.subheader("Species Legend")
+    legend_cols = st.columns(4)
+    for legend_col, legend_html in zip(legend_cols, build_legend_html(tuple(selected_species))):
+        if legend_html:
+            legend_col.markdown(legend_html, unsafe_allow_html=True)
+
+with col2:
+    migration_details(filtered_migrations, selected_species, since, now)
+
     # Statistics section
     st.subheader("Migration Statistics")
     
     if not filtered_migrations.empty:
+        # SQLite aggregates counts, speeds and the stored heading unit vectors, so
+        # the mean direction is circular (350° and 10° give 0°, not 180°)
+        species_stats = fetch_species_stats(tuple(selected_species), since)
+        species_stats["dominant_direction"] = np.degrees(
+            np.arctan2(species_stats["sin_dir"], species_stats["cos_dir"])
+        ) % 360
+        species_stats["cardinal"] = direction_to_cardinal(species_stats["dominant_direction"].to_numpy())
+        
         # Migration statistics by species
         st.write("**Migration Counts by Species:**")
-        species_counts = filtered_migrations["species"].value_counts()
-        for species, count in species_counts.items():
+        for species, count in species_stats["count"].sort_values(ascending=False).items():
             st.write(f"- {species}: {count}")
         
         # Average speeds
         st.write("**Average Speeds:**")
-        for species in selected_species:
-            species_data = filtered_migrations[filtered_migrations["species"] == species]
-            if not species_data.empty:
-                avg_speed = species_data["speed"].mean()
-                st.write(f"- {species}: {avg_speed:.1f} km/h")
+        for species, avg_speed in species_stats["avg_speed"].items():
+            st.write(f"- {species}: {avg_speed:.1f} km/h")
         
         # Dominant directions
         st.write("**Dominant Migration Directions:**")
-        for species in selected_species:
-            species_data = filtered_migrations[filtered_migrations["species"] == species]
-            if not species_data.empty:
-                # Calculate the most common direction range
-                direction_bins = pd.cut(species_data["direction"], 
-                                       bins=[0, 45, 90, 135, 180, 225, 270, 315, 360],
-                                       labels=["N-NE", "NE-E", "E-SE", "SE-S", "S-SW", "SW-W", "W-NW", "NW-N"])
-                dominant_direction = direction_bins.mode()[0]
-                st.write(f"- {species}: {dominant_direction}")
-
-# Auto-refresh option
-if "auto_refresh" not in st.session_state:
-    st.session_state.auto_refresh = False
+        for species, dominant_direction, cardinal in species_stats[["dominant_direction", "cardinal"]].itertuples():
+            st.write(f"- {species}: {dominant_direction:.0f}° ({cardinal})")
 
+# Auto-refresh option (the checkbox keeps its state in st.session_state.auto_refresh)
 st.sidebar.title("Refresh Options")
-st.session_state.auto_refresh = st.sidebar.checkbox("Enable auto-refresh (30 seconds)")
+st.sidebar.checkbox("Enable auto-refresh (30 seconds)", key="auto_refresh")
 
 if st.session_state.auto_refresh:
-    st.sidebar.write("Next update in", 30 - (time.time() % 30), "seconds")
-    time.sleep(1)
-    st.rerun()
\ No newline at end of file
+    # The rerun is scheduled in the browser, so no server thread sleeps waiting for it
+    st_autorefresh(interval=30_000, key="marine_refresh")
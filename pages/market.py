@@ -1,14 +1,47 @@
 import streamlit as st
-from PIL import Image
+import re
 import sqlite3
-import pandas as pd
+from html import escape
+from operator import itemgetter
+from types import MappingProxyType
+
+from database import read_connection, write_connection
+
+# Image URLs, each written out once and shared by every product that uses it
+HERO_IMAGE = "https://images.unsplash.com/photo-1735968665229-39785549cf7a?q=80&w=1170&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"
+_SALMON_IMG = "https://images.unsplash.com/photo-1585688964690-97f5853eb141?q=80&w=1170&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"
+_FISH_IMG = "https://images.unsplash.com/photo-1519708227418-c8fd9a32b7a2?q=80&w=1170&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"
+_SHELLFISH_IMG = "https://images.unsplash.com/photo-1510130387422-82bed34b37e9?q=80&w=1335&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"
+
+# Product images by product name. The browser fetches and caches these URLs
+# itself, so the server never downloads or decodes the images.
+PRODUCT_IMAGES = MappingProxyType({
+    "Fresh Salmon": _SALMON_IMG,
+    "Fish": _FISH_IMG,
+    "Tuna": _FISH_IMG,
+    "Crabs": _SHELLFISH_IMG,
+    "Prawns": _SHELLFISH_IMG,
+    "Oysters": _SHELLFISH_IMG,
+})
+
+# Default image for products not in the mapping
+DEFAULT_IMAGE = _FISH_IMG
+
+# Display symbol for each stored currency code
+CURRENCY_SYMBOL = MappingProxyType({"USD": "$"})
+
+# Above this many matching products the grid defaults to the single-table catalog view
+CARD_VIEW_MAX_PRODUCTS = 12
+
+# Display color for each stock level
+STOCK_COLOR = MappingProxyType({"High": "green", "Medium": "orange", "Low": "red"})
 
 # Page Title
 st.title("Market Place 🛒")
 st.write("Connect directly with fishers and buy fresh seafood.")
 
 # Hero Section
-st.image("https://images.unsplash.com/photo-1735968665229-39785549cf7a?q=80&w=1170&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D", use_container_width=True)
+st.image(HERO_IMAGE, use_container_width=True)
 st.markdown(
     """
     **Welcome to the Marine Market!**  
@@ -17,165 +50,282 @@ st.markdown(
     """
 )
 
-# Initialize database tables for marketplace
+def parse_legacy_price(price: str) -> tuple:
+    """Split a text price such as "$15/kg" into (price in cents, unit).
+
+    Raises ValueError for text not of that form.
+    """
+    match = re.fullmatch(r"\$(\d+(?:\.\d{1,2})?)(?:/(\w+))?", price.strip())
+    if match is None:
+        raise ValueError(f"unrecognised price {price!r}")
+    return round(float(match[1]) * 100), match[2] or "kg"
+
+def format_price(price_cents: int, currency: str, unit: str) -> str:
+    """Format a stored price for display, e.g. "$15.00/kg"."""
+    return f"{CURRENCY_SYMBOL.get(currency, currency + ' ')}{price_cents / 100:.2f}/{unit}"
+
+# Products schema, shared by new databases and the legacy price migration
+CREATE_PRODUCTS_SQL = """CREATE TABLE IF NOT EXISTS {table} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    price_cents INTEGER NOT NULL CHECK(price_cents >= 0),
+                    currency TEXT NOT NULL DEFAULT 'USD',
+                    unit TEXT NOT NULL DEFAULT 'kg',
+                    fisher_id INTEGER NOT NULL,
+                    stock_level TEXT NOT NULL CHECK(stock_level IN ('High', 'Medium', 'Low')),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (fisher_id) REFERENCES fishers(id)
+                )"""
+
+def bump_catalog_version(c, table: str) -> None:
+    """Record a write to a catalog table so its persisted cache is refreshed."""
+    c.execute("UPDATE catalog_versions SET version = version + 1 WHERE name = ?", (table,))
+
+# Initialize database tables for marketplace once per process; errors are raised
+# rather than cached so a failed bootstrap is retried on the next rerun
+@st.cache_resource
 def init_marketplace_db():
-    try:
-        with sqlite3.connect("marine_data.db") as conn:
-            c = conn.cursor()
+    with write_connection() as conn:
+        c = conn.cursor()
+        
+        # Create fishers table
+        c.execute("""CREATE TABLE IF NOT EXISTS fishers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    contact TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )""")
+        
+        # Create products table
+        c.execute(CREATE_PRODUCTS_SQL.format(table="products"))
+        
+        # Per-table change counters; anything writing to fishers or products bumps them
+        c.execute("""CREATE TABLE IF NOT EXISTS catalog_versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )""")
+        c.execute("INSERT OR IGNORE INTO catalog_versions (name) VALUES ('fishers'), ('products')")
+        
+        # Databases seeded before prices were numeric store them as text like "$15/kg".
+        # Rebuild that table with the current schema, parsing each price once; an
+        # unparseable price aborts the whole transaction, leaving the data untouched.
+        columns = {row[1] for row in c.execute("PRAGMA table_info(products)")}
+        if "price_cents" not in columns:
+            migrated = []
+            for product_id, name, price, fisher_id, stock_level, created_at in c.execute(
+                    "SELECT id, name, price, fisher_id, stock_level, created_at FROM products").fetchall():
+                try:
+                    price_cents, unit = parse_legacy_price(price)
+                except ValueError as e:
+                    raise ValueError(f"cannot migrate product {product_id} ({name}): {e}") from e
+                migrated.append((product_id, name, price_cents, unit, fisher_id, stock_level, created_at))
+            c.execute(CREATE_PRODUCTS_SQL.format(table="products_migrated"))
+            c.executemany("""INSERT INTO products_migrated
+                             (id, name, price_cents, unit, fisher_id, stock_level, created_at)
+                             VALUES (?, ?, ?, ?, ?, ?, ?)""", migrated)
+            c.execute("DROP TABLE products")
+            c.execute("ALTER TABLE products_migrated RENAME TO products")
+            bump_catalog_version(c, "products")
+        
+        # Index the join key and fisher lookups by name
+        c.execute("CREATE INDEX IF NOT EXISTS idx_products_fisher ON products(fisher_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_fishers_name ON fishers(name)")
+        
+        # Only seed an empty table; EXISTS stops at the first row instead of counting
+        c.execute("SELECT EXISTS (SELECT 1 FROM fishers)")
+        
+        if not c.fetchone()[0]:
+            # Insert sample fishers
+            fishers = [
+                ("Ocean Harvest Co-op", "North Pacific", "contact@oceanharvest.com"),
+                ("Coastal Fishers Ltd.", "South Bay", "info@coastalfishers.com"),
+                ("Blue Waters Fishing", "East Atlantic", "sales@bluewaters.com"),
+                ("Bay Crabbers Association", "Rocky Shore", "info@baycrabbers.org"),
+                ("Tropical Seafood Co.", "Gulf Waters", "orders@tropicalseafood.com"),
+                ("Reef Harvesters", "Coastal Reefs", "contact@reefharvesters.com")
+            ]
             
-            # Create fishers table
-            c.execute("""CREATE TABLE IF NOT EXISTS fishers (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        location TEXT NOT NULL,
-                        contact TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )""")
+            c.executemany("INSERT INTO fishers (name, location, contact) VALUES (?, ?, ?)", fishers)
             
-            # Create products table
-            c.execute("""CREATE TABLE IF NOT EXISTS products (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        price TEXT NOT NULL,
-                        fisher_id INTEGER NOT NULL,
-                        stock_level TEXT NOT NULL CHECK(stock_level IN ('High', 'Medium', 'Low')),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (fisher_id) REFERENCES fishers(id)
-                    )""")
+            # Get fisher IDs for product references
+            c.execute("SELECT id, name FROM fishers")
+            fisher_map = {name: id for id, name in c.fetchall()}
             
-            # Check if we need to insert sample data
-            c.execute("SELECT COUNT(*) FROM fishers")
-            fisher_count = c.fetchone()[0]
+            # Insert sample products
+            products = [
+                ("Fresh Salmon", 1500, "kg", fisher_map["Ocean Harvest Co-op"], "High"),
+                ("Fish", 2500, "kg", fisher_map["Coastal Fishers Ltd."], "Medium"),
+                ("Tuna", 1800, "kg", fisher_map["Blue Waters Fishing"], "Low"),
+                ("Crabs", 2200, "kg", fisher_map["Bay Crabbers Association"], "High"),
+                ("Prawns", 2000, "kg", fisher_map["Tropical Seafood Co."], "Medium"),
+                ("Oysters", 3000, "kg", fisher_map["Reef Harvesters"], "Low")
+            ]
             
-            if fisher_count == 0:
-                # Insert sample fishers
-                fishers = [
-                    ("Ocean Harvest Co-op", "North Pacific", "contact@oceanharvest.com"),
-                    ("Coastal Fishers Ltd.", "South Bay", "info@coastalfishers.com"),
-                    ("Blue Waters Fishing", "East Atlantic", "sales@bluewaters.com"),
-                    ("Bay Crabbers Association", "Rocky Shore", "info@baycrabbers.org"),
-                    ("Tropical Seafood Co.", "Gulf Waters", "orders@tropicalseafood.com"),
-                    ("Reef Harvesters", "Coastal Reefs", "contact@reefharvesters.com")
-                ]
-                
-                c.executemany("INSERT INTO fishers (name, location, contact) VALUES (?, ?, ?)", fishers)
-                
-                # Get fisher IDs for product references
-                c.execute("SELECT id, name FROM fishers")
-                fisher_map = {name: id for id, name in c.fetchall()}
-                
-                # Insert sample products
-                products = [
-                    ("Fresh Salmon", "$15/kg", fisher_map["Ocean Harvest Co-op"], "High"),
-                    ("Fish", "$25/kg", fisher_map["Coastal Fishers Ltd."], "Medium"),
-                    ("Tuna", "$18/kg", fisher_map["Blue Waters Fishing"], "Low"),
-                    ("Crabs", "$22/kg", fisher_map["Bay Crabbers Association"], "High"),
-                    ("Prawns", "$20/kg", fisher_map["Tropical Seafood Co."], "Medium"),
-                    ("Oysters", "$30/kg", fisher_map["Reef Harvesters"], "Low")
-                ]
-                
-                c.executemany("INSERT INTO products (name, price, fisher_id, stock_level) VALUES (?, ?, ?, ?)", products)
-                
-                conn.commit()
-    except sqlite3.Error as e:
-        st.error(f"Marketplace database initialization failed: {str(e)}")
-        return False
+            c.executemany("INSERT INTO products (name, price_cents, unit, fisher_id, stock_level) VALUES (?, ?, ?, ?, ?)", products)
+            bump_catalog_version(c, "fishers")
+            bump_catalog_version(c, "products")
     return True
 
-# Connect to SQLite database
-@st.cache_resource
-def get_connection():
-    return sqlite3.connect('marine_data.db', check_same_thread=False)
+# Columns returned by load_products, in order
+PRODUCT_COLUMNS = ("id", "name", "price_cents", "currency", "unit", "fisher_id", "stock_level")
+# Columns of the catalog build_catalog joins from products and fishers, in order
+CATALOG_COLUMNS = ("id", "name", "price_cents", "currency", "unit", "fisher_name", "location",
+                   "stock_level", "image_url")
+# Positions of the filtered fields in each catalog row
+FISHER_IDX = CATALOG_COLUMNS.index("fisher_name")
+LOCATION_IDX = CATALOG_COLUMNS.index("location")
+STOCK_IDX = CATALOG_COLUMNS.index("stock_level")
+
+def read_catalog_versions() -> dict:
+    """Return the current change counter of each catalog table."""
+    with read_connection() as conn:
+        return dict(conn.execute("SELECT name, version FROM catalog_versions"))
+
+# Fishers and products are cached separately, each persisted to disk as a single
+# entry stamped with its table's version, and joined outside either cache. Errors
+# are left to the caller so an empty result is never persisted.
+@st.cache_data(persist="disk")
+def load_fishers() -> tuple:
+    """Return the fishers version and each fisher's (name, location), keyed by fisher id."""
+    query = "SELECT id, name, location FROM fishers"
+    with read_connection() as conn:
+        # Read the version first: a write landing in between only forces an extra reload
+        version = conn.execute("SELECT version FROM catalog_versions WHERE name = 'fishers'").fetchone()[0]
+        return version, {fisher_id: (name, location) for fisher_id, name, location in conn.execute(query)}
+
+@st.cache_data(persist="disk")
+def load_products() -> tuple:
+    """Return the products version and the table as one list per column, keyed by PRODUCT_COLUMNS."""
+    query = f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products"
+    with read_connection() as conn:
+        version = conn.execute("SELECT version FROM catalog_versions WHERE name = 'products'").fetchone()[0]
+        rows = conn.execute(query).fetchall()
+    return version, {column: list(map(itemgetter(i), rows)) for i, column in enumerate(PRODUCT_COLUMNS)}
+
+def load_current(loader, version: int) -> dict:
+    """Return a catalog loader's data, clearing its cache first if the table has changed since."""
+    cached_version, data = loader()
+    if cached_version != version:
+        # Replace the single persisted entry rather than adding one per version
+        loader.clear()
+        _, data = loader()
+    return data
+
+@st.cache_data(max_entries=4)
+def build_catalog(products: dict, fishers: dict) -> dict:
+    """Join products to their fishers in Python, one list per column keyed by CATALOG_COLUMNS."""
+    # Like the SQL inner join this replaces, products without a known fisher are left out.
+    # Image URLs are resolved here once, so rendering just reads the image_url column.
+    rows = [
+        (product_id, name, price_cents, currency, unit, *fishers[fisher_id], stock_level,
+         PRODUCT_IMAGES.get(name, DEFAULT_IMAGE))
+        for product_id, name, price_cents, currency, unit, fisher_id, stock_level
+        in zip(*(products[column] for column in PRODUCT_COLUMNS))
+        if fisher_id in fishers
+    ]
+    return {column: list(map(itemgetter(i), rows)) for i, column in enumerate(CATALOG_COLUMNS)}
 
-# Load products from database
 @st.cache_data
-def load_products():
-    conn = get_connection()
-    try:
-        query = """
-        SELECT 
-            p.id, 
-            p.name, 
-            p.price, 
-            f.name as fisher_name, 
-            f.location, 
-            p.stock_level
-        FROM 
-            products p
-        JOIN 
-            fishers f ON p.fisher_id = f.id
-        """
-        df = pd.read_sql(query, conn)
-        return df
-    except Exception as e:
-        st.error(f"Database error: {e}")
-        return pd.DataFrame()
+def render_card_html(name: str, price: str, fisher_name: str, location: str,
+                     stock_level: str, image_url: str) -> str:
+    """Return a product card as one HTML block; the Add to Cart button is rendered separately."""
+    return (
+        f"<img src='{image_url}' loading='lazy' decoding='async' style='width: 100%;'/>"
+        f"<p><b>{escape(name)}</b></p>"
+        f"<p>💰 {escape(price)}</p>"
+        f"<p>🚢 <b>Source</b>: {escape(fisher_name)}</p>"
+        f"<p>📍 <b>Location</b>: {escape(location)}</p>"
+        f"<p>📦 <b>Stock</b>: <span style='color:{STOCK_COLOR[stock_level]}'>{stock_level}</span></p>"
+    )
+
+@st.cache_data
+def build_filter_options(catalog: dict) -> tuple:
+    """Return the fisher and location selectbox options, each led by "All"."""
+    return (("All", *dict.fromkeys(catalog["fisher_name"])),
+            ("All", *dict.fromkeys(catalog["location"])))
 
 # Initialize marketplace database tables and sample data
-db_initialized = init_marketplace_db()
+try:
+    db_initialized = init_marketplace_db()
+except (sqlite3.Error, ValueError) as e:
+    st.error(f"Marketplace database initialization failed: {str(e)}")
+    db_initialized = False
 
 if not db_initialized:
     st.error("Failed to initialize marketplace database. Please check the logs.")
 else:
-    # Image mapping
-    product_images = {
-        "Fresh Salmon": "https://images.unsplash.com/photo-1585688964690-97f5853eb141?q=80&w=1170&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
-        "Fish": "https://images.unsplash.com/photo-1519708227418-c8fd9a32b7a2?q=80&w=1170&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
-        "Tuna": "https://images.unsplash.com/photo-1519708227418-c8fd9a32b7a2?q=80&w=1170&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
-        "Crabs": "https://images.unsplash.com/photo-1510130387422-82bed34b37e9?q=80&w=1335&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
-        "Prawns": "https://images.unsplash.com/photo-1510130387422-82bed34b37e9?q=80&w=1335&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
-        "Oysters": "https://images.unsplash.com/photo-1510130387422-82bed34b37e9?q=80&w=1335&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
-    }
-
-    # Default image for products not in the mapping
-    default_image = "https://images.unsplash.com/photo-1519708227418-c8fd9a32b7a2?q=80&w=1170&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"
-
     # Load products
-    products_df = load_products()
+    try:
+        versions = read_catalog_versions()
+        catalog = build_catalog(load_current(load_products, versions["products"]),
+                                load_current(load_fishers, versions["fishers"]))
+    except Exception as e:
+        st.error(f"Database error: {e}")
+        catalog = {column: [] for column in CATALOG_COLUMNS}
 
-    if products_df.empty:
+    if not catalog["id"]:
         st.warning("No products found in the database.")
     else:
         # Filter options
         st.subheader("🔍 Filter Products")
+        fisher_options, location_options = build_filter_options(catalog)
         col1, col2, col3 = st.columns(3)
         with col1:
-            fisher_filter = st.selectbox("Fisher", ["All"] + list(products_df["fisher_name"].unique()))
+            fisher_filter = st.selectbox("Fisher", fisher_options)
         with col2:
-            location_filter = st.selectbox("Location", ["All"] + list(products_df["location"].unique()))
+            location_filter = st.selectbox("Location", location_options)
         with col3:
             stock_filter = st.selectbox("Stock Level", ["All", "High", "Medium", "Low"])
 
-        # Apply filters
-        filtered_df = products_df.copy()
-        if fisher_filter != "All":
-            filtered_df = filtered_df[filtered_df["fisher_name"] == fisher_filter]
-        if location_filter != "All":
-            filtered_df = filtered_df[filtered_df["location"] == location_filter]
-        if stock_filter != "All":
-            filtered_df = filtered_df[filtered_df["stock_level"] == stock_filter]
+        # Apply all filters in one pass over plain row tuples in CATALOG_COLUMNS order
+        selected = [
+            row for row in zip(*(catalog[column] for column in CATALOG_COLUMNS))
+            if (fisher_filter == "All" or row[FISHER_IDX] == fisher_filter)
+            and (location_filter == "All" or row[LOCATION_IDX] == location_filter)
+            and (stock_filter == "All" or row[STOCK_IDX] == stock_filter)
+        ]
 
         # Product Grid Layout (3 columns)
         st.subheader("🛍️ Featured Products")
-        if filtered_df.empty:
+        catalog_view = st.toggle("Catalog view", value=len(selected) > CARD_VIEW_MAX_PRODUCTS,
+                                 help="List all matching products in one table")
+        if not selected:
             st.info("No products match your filter criteria. Please try different filters.")
+        elif catalog_view:
+            # One table element for the whole selection, however many products match
+            matches = dict(zip(CATALOG_COLUMNS, map(list, zip(*selected))))
+            st.dataframe(
+                {
+                    "image_url": matches["image_url"],
+                    "name": matches["name"],
+                    "price": list(map(format_price, matches["price_cents"], matches["currency"], matches["unit"])),
+                    "fisher_name": matches["fisher_name"],
+                    "location": matches["location"],
+                    "stock_level": matches["stock_level"],
+                },
+                column_config={
+                    "image_url": st.column_config.ImageColumn("Image"),
+                    "name": "Product",
+                    "price": "Price",
+                    "fisher_name": "Source",
+                    "location": "Location",
+                    "stock_level": "Stock",
+                },
+                hide_index=True,
+                use_container_width=True,
+            )
         else:
             cols = st.columns(3)
-            for index, row in filtered_df.iterrows():
-                with cols[index % 3]:  # Distribute products across columns
-                    # Get image from mapping or use default
-                    image_url = product_images.get(row["name"], default_image)
-                    st.image(image_url, use_container_width=True)
-                    st.write(f"**{row['name']}**")
-                    st.write(f"💰 {row['price']}")
-                    
-                    # Display fisher and stock information
-                    stock_color = {"High": "green", "Medium": "orange", "Low": "red"}[row["stock_level"]]
-                    st.markdown(f"🚢 **Source**: {row['fisher_name']}")
-                    st.markdown(f"📍 **Location**: {row['location']}")
-                    st.markdown(f"📦 **Stock**: <span style='color:{stock_color}'>{row['stock_level']}</span>", unsafe_allow_html=True)
+            for position, (product_id, name, price_cents, currency, unit, fisher_name, location,
+                           stock_level, image_url) in enumerate(selected):
+                with cols[position % 3]:  # Distribute products across columns
+                    # Image, details and stock as one cached element per card
+                    price = format_price(price_cents, currency, unit)
+                    st.markdown(render_card_html(name, price, fisher_name, location, stock_level, image_url),
+                                unsafe_allow_html=True)
                     
-                    st.button("Add to Cart", key=f"product_{row['id']}")
+                    st.button("Add to Cart", key=f"product_{product_id}")
 
 # Footer
 st.markdown("---")